@@ -1,5 +1,6 @@
 import re
 import csv
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 import pandas as pd
 
@@ -13,19 +14,19 @@ def analyze_and_chunk_markdown(text):
     """
     regex_patterns = {
         "generic": re.compile(
-            r'^(?:\|?\s*)?(?:#{1,6}\s*)?(?P<num>I{1,3}\d*|[1-9]\d*)[.\-—–]*\s*(?P<title>.+)',
+            r'^(?:\|?\s*)?(?:#{1,6}\s*)?(?P<num>(?:I{1,3}\d*|[1-9]\d*)(?:\s*(?:bis|ter|quater)\b)?)[.\-—–]*\s*(?P<title>.+)',
             re.MULTILINE
         ),
         "header": re.compile(
-            r'^(?:\|?\s*)?#{1,6}\s*(?P<num>I{1,3}\d*|[1-9]\d*)[.\-—–]*\s*(?P<title>.+)',
+            r'^(?:\|?\s*)?#{1,6}\s*(?P<num>(?:I{1,3}\d*|[1-9]\d*)(?:\s*(?:bis|ter|quater)\b)?)[.\-—–]*\s*(?P<title>.+)',
             re.MULTILINE
         ),
         "bullet": re.compile(
-            r'^(?:\|?\s*)?(?:[-*]\s*)?(?P<num>I{1,3}\d*|[1-9]\d*)[.\-—–]*\s*(?P<title>.+)',
+            r'^(?:\|?\s*)?(?:[-*]\s*)?(?P<num>(?:I{1,3}\d*|[1-9]\d*)(?:\s*(?:bis|ter|quater)\b)?)[.\-—–]*\s*(?P<title>.+)',
             re.MULTILINE
         ),
         "pipe_prefix": re.compile(
-            r'^\|\s*(?P<num>I{1,3}\d*|[1-9]\d*)[.\-—–]*\s*(?P<title>.+)',
+            r'^\|\s*(?P<num>(?:I{1,3}\d*|[1-9]\d*)(?:\s*(?:bis|ter|quater)\b)?)[.\-—–]*\s*(?P<title>.+)',
             re.MULTILINE
         ),
     }
@@ -58,12 +59,14 @@ def analyze_and_chunk_markdown(text):
 # ---------------------------------------------------------
 # 2️⃣ POST-PROCESSING FUNCTIONS
 # ---------------------------------------------------------
+LOT_PATTERN = re.compile(r'(?:^|\n|\| |## |### |# |\s|•)(\d{1,3})(?:\s*[\.\-–—]\s*)(?=[A-ZÀ-ÖØ-öø-ÿ])')
+
+
 def split_based_on_gap(df):
     """
     Split rows when missing lot numbers are found embedded in text
     and they exactly fill the numeric gap.
     """
-    lot_pattern = re.compile(r'(?:^|\n|\| |## |### |# |\s|•)(\d{1,3})(?:\s*[\.\-–—]\s*)(?=[A-ZÀ-ÖØ-öø-ÿ])')
     split_rows = []
 
     df = df.sort_values(['catalogue_id', 'index']).reset_index(drop=True)
@@ -73,19 +76,17 @@ def split_based_on_gap(df):
         text = str(row['text'])
         index = row['index']
 
-        try:
-            current_num = int(re.sub(r'\D', '', str(row['num'])))
-        except:
+        current_key = parse_lot_number(row['num'])
+        if current_key is None:
             split_rows.append(row.to_dict())
             continue
+        current_num = current_key[0]
 
         # Determine next number
         next_num = None
         if i + 1 < len(df) and df.loc[i + 1, 'catalogue_id'] == catalogue_id:
-            try:
-                next_num = int(re.sub(r'\D', '', str(df.loc[i + 1, 'num'])))
-            except:
-                pass
+            next_key = parse_lot_number(df.loc[i + 1, 'num'])
+            next_num = next_key[0] if next_key is not None else None
 
         if not next_num:
             split_rows.append(row.to_dict())
@@ -97,19 +98,19 @@ def split_based_on_gap(df):
             continue
 
         embedded_nums = sorted(set(
-            int(m.group(1)) for m in lot_pattern.finditer(text)
+            int(m.group(1)) for m in LOT_PATTERN.finditer(text)
             if current_num < int(m.group(1)) < next_num
         ))
 
         if len(embedded_nums) == gap and embedded_nums == list(range(current_num + 1, next_num)):
             print(f"🔍 Splitting row {index} ({current_num}) → found embedded lots {embedded_nums}")
-            matches = list(lot_pattern.finditer(text))
+            matches = list(LOT_PATTERN.finditer(text))
             segments = []
             for j, m in enumerate(matches):
                 start = m.start()
                 end = matches[j + 1].start() if j + 1 < len(matches) else len(text)
                 seg_text = text[start:end].strip()
-                num_match = re.match(lot_pattern, seg_text)
+                num_match = re.match(LOT_PATTERN, seg_text)
                 if not num_match:
                     continue
                 seg_num = int(num_match.group(1))
@@ -132,39 +133,277 @@ def split_based_on_gap(df):
     return new_df
 
 
-def merge_sandwiched_errors(df):
+# ---------------------------------------------------------
+# 3️⃣ SEQUENCE ALIGNMENT
+# ---------------------------------------------------------
+LOT_SUFFIXES = {"bis": 1, "ter": 2, "quater": 3}
+RESTART_MAX_START = 2  # numbering restarting at or below this starts a new section
+RESTART_MIN_RUN = 5  # consecutive lots needed to confirm a restart
+NUM_PATTERN = re.compile(r'^\s*(?P<digits>.*?)\s*(?P<suffix>bis|ter|quater)?[\s.\-–—]*$', re.IGNORECASE)
+
+
+def parse_lot_number(val):
+    """
+    Parse a lot number such as "14", "I4." or "203 bis" into a sortable
+    (number, suffix rank) key, or None if no number can be read.
+    OCR often reads "1" as "I", as in the chunking patterns.
+    """
+    m = NUM_PATTERN.match(str(val))
+    digits = re.sub(r'\D', '', m.group("digits").replace("I", "1")) if m else ''
+    if not digits:
+        return None
+    suffix = (m.group("suffix") or "").lower()
+    return int(digits), LOT_SUFFIXES.get(suffix, 0)
+
+
+def longest_increasing_lots(keys):
+    """
+    Return the positions of the longest strictly increasing subsequence
+    of lot keys (None entries are skipped), in O(n log n).
+
+    Among subsequences of equal length, each lot takes the predecessor
+    closest below it (the first copy on ties), so the subsequence stays
+    as close as possible to consecutive numbering.
+
+    >>> longest_increasing_lots([(37, 0), (14, 0), (39, 0)])
+    [0, 2]
+    >>> longest_increasing_lots([(55, 0), (56, 0), (57, 0), (56, 0), (57, 0), (58, 0)])
+    [0, 1, 2, 5]
+    """
+    tails = []   # smallest key ending a subsequence of each length
+    levels = []  # per length: negated keys (non-decreasing) and positions, in reading order
+    parent = [None] * len(keys)
+
+    for pos, key in enumerate(keys):
+        if key is None:
+            continue
+        neg_key = (-key[0], -key[1])
+        k = bisect_left(tails, key)
+        if k > 0:
+            neg_keys, positions = levels[k - 1]
+            parent[pos] = positions[bisect_right(neg_keys, neg_key)]
+        if k == len(tails):
+            tails.append(key)
+            levels.append(([], []))
+        else:
+            tails[k] = key
+        levels[k][0].append(neg_key)
+        levels[k][1].append(pos)
+
+    if not levels:
+        return []
+
+    # The subsequence ends on the lot closest to its predecessor
+    def step(p):
+        return keys[p][0] - keys[parent[p]][0] if parent[p] is not None else 0
+
+    pos = min(levels[-1][1], key=lambda p: (step(p), p))
+    kept = []
+    while pos is not None:
+        kept.append(pos)
+        pos = parent[pos]
+    return kept[::-1]
+
+
+def missing_between(prev_key, next_key):
+    """
+    Number of plain lot numbers expected strictly between two lot keys.
+    Suffixed lots ("bis", "ter") are extras and never expected.
+    """
+    if next_key[0] == prev_key[0]:
+        return 0
+    return next_key[0] - prev_key[0] - (0 if next_key[1] else 1)
+
+
+def split_lot_sections(keys):
+    """
+    Split a catalogue into sections where the numbering restarts, as in
+    multi-section or multi-day sales: after a section of several lots, a low
+    number well below the previous lot, followed by a run of consecutive lots.
+    Returns (start, end) positions.
+
+    >>> split_lot_sections([(n, 0) for n in [1, 2, 3, 4, 5, 6, 1, 2, 3, 4, 5]])
+    [(0, 6), (6, 11)]
+    >>> split_lot_sections([(n, 0) for n in [17, 18, 2, 19, 20, 21, 22, 23]])
+    [(0, 8)]
+    >>> split_lot_sections([(n, 0) for n in [1460, 1, 2, 3, 4, 5]])
+    [(0, 6)]
+    """
+    numbered = [pos for pos, key in enumerate(keys) if key is not None]
+    starts = [0]
+    section_start = 0  # index in `numbered` of the current section's first lot
+    for i, pos in enumerate(numbered[1:], start=1):
+        num = keys[pos][0]
+        run = [keys[p][0] for p in numbered[i:i + RESTART_MIN_RUN]]
+        if (num <= RESTART_MAX_START
+                and i - section_start >= RESTART_MIN_RUN
+                and keys[numbered[i - 1]][0] >= num + RESTART_MIN_RUN
+                and len(run) == RESTART_MIN_RUN
+                and all(0 < b - a <= 2 for a, b in zip(run, run[1:]))):
+            starts.append(pos)
+            section_start = i
+    return list(zip(starts, starts[1:] + [len(keys)]))
+
+
+def classify_lot_sequence(rows):
+    """
+    Align the lot numbers of one catalogue (rows in reading order) against
+    their longest increasing subsequence and classify each break:
+
+     * restart: the numbering starts again (a new section is aligned)
+     * misread: outliers that exactly fill the gap between two anchors
+     * order: an outlier whose number fills a gap elsewhere in the section
+     * duplicate: an outlier repeating the number of an anchor
+     * merge: an outlier that does not belong between its anchors,
+       i.e. a spurious line start that should join the previous lot
+     * split: a gap whose missing lots are embedded in the previous lot
+     * gap: any other missing lots
+
+    Returns a list of dicts with the row position, kind, suggested number
+    and whether the break can be repaired automatically: only a single
+    spurious number sandwiched between consecutive lots is.
+
+    >>> def flags(*nums):
+    ...     rows = [{"num": num, "title": "", "text": ""} for num in nums]
+    ...     return [(f["pos"], f["kind"], f["suggested_num"], f["repairable"])
+    ...             for f in classify_lot_sequence(rows)]
+    >>> flags("37", "14", "39")
+    [(1, 'misread', 38, False)]
+    >>> flags("36", "37", "14", "39", "40")
+    [(2, 'misread', 38, False)]
+    >>> flags("43", "44", "1599", "1619", "47", "48")
+    [(2, 'misread', 45, False), (3, 'misread', 46, False)]
+    >>> flags("3", "4", "4 bis", "5")
+    []
+    >>> flags("3", "4 bis", "5")
+    [(1, 'gap', None, False)]
+    >>> flags("54", "55", "56", "57", "56", "57", "58")
+    [(4, 'duplicate', None, False), (5, 'duplicate', None, False)]
+    >>> flags("17", "18", "2", "19", "20")
+    [(2, 'merge', None, True)]
+    >>> flags("17", "18", "2", "3", "19", "20")
+    [(2, 'merge', None, False), (3, 'merge', None, False)]
+    >>> flags("54", "55", "57", "56", "58")
+    [(3, 'order', None, False)]
+    >>> flags("10", *[str(n) for n in range(12, 21)], "11", "21", "22")
+    [(10, 'order', None, False)]
+    >>> flags(*[str(n) for n in range(1, 31)], *[str(n) for n in range(1, 21)])
+    [(30, 'restart', None, False)]
     """
-    Merge OCR errors where a wrong number is sandwiched between two sequential ones.
+    keys = [parse_lot_number(row["num"]) for row in rows]
+    flags = []
+    for start, end in split_lot_sections(keys):
+        if start > 0:
+            flags.append({"pos": start, "kind": "restart", "suggested_num": None, "repairable": False})
+        for flag in classify_lot_section(rows[start:end], keys[start:end]):
+            flag["pos"] += start
+            flags.append(flag)
+    return sorted(flags, key=lambda f: f["pos"])
+
+
+def classify_lot_section(rows, keys):
+    """
+    Classify the breaks of one section of a catalogue (see classify_lot_sequence).
+    """
+    anchors = longest_increasing_lots(keys)
+    anchor_keys = {keys[pos] for pos in anchors}
+
+    # Segments of outliers between consecutive anchors (None = catalogue edge)
+    bounds = [None] + anchors + [None]
+    segments = []
+    for prev_pos, next_pos in zip(bounds, bounds[1:]):
+        lo = prev_pos + 1 if prev_pos is not None else 0
+        hi = next_pos if next_pos is not None else len(rows)
+        outliers = [pos for pos in range(lo, hi) if keys[pos] is not None]
+        prev_key = keys[prev_pos] if prev_pos is not None else (0, 0)
+        missing = missing_between(prev_key, keys[next_pos]) if next_pos is not None else 0
+        segments.append({
+            "prev": prev_pos, "next": next_pos, "outliers": outliers,
+            "missing": missing, "consumed": 0,
+        })
+
+    # Every gap of the section, sorted by lower bound since anchors increase
+    gaps = [s for s in segments if s["prev"] is not None and s["next"] is not None and s["missing"] > 0]
+    gap_starts = [keys[s["prev"]] for s in gaps]
+
+    def open_gap(key):
+        """The gap whose missing lots include `key`, if any are still unaccounted for."""
+        i = bisect_left(gap_starts, key) - 1
+        if i < 0 or not key < keys[gaps[i]["next"]]:
+            return None
+        gap = gaps[i]
+        return gap if gap["consumed"] < gap["missing"] else None
+
+    flags = []
+    for segment in segments:
+        outliers = segment["outliers"]
+        if not outliers:
+            continue
+        prev_key = keys[segment["prev"]] if segment["prev"] is not None else (0, 0)
+        next_key = keys[segment["next"]] if segment["next"] is not None else None
+
+        if next_key is not None and segment["missing"] == len(outliers):
+            segment["consumed"] = segment["missing"]
+            for j, pos in enumerate(outliers):
+                flags.append({"pos": pos, "kind": "misread", "suggested_num": prev_key[0] + 1 + j,
+                              "repairable": False})
+            continue
+
+        for pos in outliers:
+            key = keys[pos]
+            if key in anchor_keys:
+                flags.append({"pos": pos, "kind": "duplicate", "suggested_num": None, "repairable": False})
+                continue
+            if next_key is not None and prev_key < key < next_key:
+                segment["consumed"] += 1
+                flags.append({"pos": pos, "kind": "misread", "suggested_num": None, "repairable": False})
+                continue
+            gap = open_gap(key)
+            if gap is not None:
+                # A displaced lot: never merged, whichever gap it belongs to
+                gap["consumed"] += 1
+                flags.append({"pos": pos, "kind": "order", "suggested_num": None, "repairable": False})
+            elif segment["prev"] is not None:
+                # Only a single number sandwiched between consecutive lots is merged without review
+                repairable = (next_key is not None and segment["missing"] == 0 and len(outliers) == 1
+                              and key != (prev_key[0] + 1, 0))
+                flags.append({"pos": pos, "kind": "merge", "suggested_num": None, "repairable": repairable})
+            else:
+                flags.append({"pos": pos, "kind": "misread", "suggested_num": None, "repairable": False})
+
+    for segment in gaps:
+        if segment["outliers"] or segment["missing"] - segment["consumed"] <= 0:
+            continue
+        prev_num, next_num = keys[segment["prev"]][0], keys[segment["next"]][0]
+        embedded = {
+            int(m.group(1)) for m in LOT_PATTERN.finditer(str(rows[segment["prev"]]["text"]))
+            if prev_num < int(m.group(1)) <= next_num
+        }
+        kind = "split" if embedded else "gap"
+        flags.append({"pos": segment["next"], "kind": kind, "suggested_num": None, "repairable": False})
+
+    return flags
+
+
+def repair_lot_sequence(df):
+    """
+    Merge a row whose number is a spurious line start sandwiched between two
+    consecutive lots (e.g. "18. bla \\n 2. bla \\n 19. bla") into the previous lot.
     """
     fixed_rows = []
 
     for catalogue_id, group in df.groupby('catalogue_id', sort=False):
-        group = group.sort_values('index').reset_index(drop=True)
-        rows = group.to_dict(orient='records')
+        rows = group.sort_values('index').to_dict(orient='records')
+        merge_pos = {f["pos"] for f in classify_lot_sequence(rows) if f["repairable"]}
+
         merged_rows = []
-        i = 0
-        while i < len(rows):
-            current = rows[i]
-            def parse_num(val):
-                try:
-                    return int(str(val).strip().strip('.-–—'))
-                except:
-                    return None
-
-            curr_num = parse_num(current['num'])
-            prev_num = parse_num(rows[i - 1]['num']) if i > 0 else None
-            next_num = parse_num(rows[i + 1]['num']) if i + 1 < len(rows) else None
-
-            if prev_num and next_num and prev_num + 1 == next_num and curr_num != prev_num + 1:
-                merged = merged_rows.pop() if merged_rows else rows[i - 1].copy()
-                merged['title'] += " " + str(current['title'])
-                merged['text'] += " " + str(current['text'].strip())
-                merged_rows.append(merged)
-                i += 1
+        for pos, row in enumerate(rows):
+            if pos in merge_pos and merged_rows:
+                merged = merged_rows[-1]
+                merged['title'] = str(merged['title']) + " " + str(row['title'])
+                merged['text'] = str(merged['text']) + " " + str(row['text']).strip()
                 continue
-
-            merged_rows.append(current)
-            i += 1
+            merged_rows.append(row)
 
         for idx, row in enumerate(merged_rows):
             row['index'] = idx + 1
@@ -175,36 +414,37 @@ def merge_sandwiched_errors(df):
 
 def recalc_inconsistencies(df):
     """
-    Recalculate inconsistencies *after* postprocessing.
+    Recalculate inconsistencies *after* postprocessing, one flag per
+    misread, displaced or spurious lot and one per gap in the sequence.
     """
     inconsistencies = []
 
     for catalogue_id, group in df.groupby("catalogue_id"):
-        group = group.sort_values("index")
-        last_num = None
-
-        for _, row in group.iterrows():
-            try:
-                num_val = int(re.sub(r'\D', '', str(row["num"])))
-            except:
-                num_val = None
-
-            if last_num and num_val and num_val != last_num + 1:
-                inconsistencies.append({
-                    "catalogue_id": catalogue_id,
-                    "prev_num": last_num,
-                    "current_num": num_val,
-                    "title": row["title"],
-                    "excerpt": row["text"].strip()
-                })
-            if num_val:
-                last_num = num_val
-
-    return pd.DataFrame(inconsistencies)
+        rows = group.sort_values("index").to_dict(orient="records")
+        numbered = [pos for pos, row in enumerate(rows) if parse_lot_number(row["num"]) is not None]
+        prev_numbered = dict(zip(numbered[1:], numbered))
+
+        for flag in classify_lot_sequence(rows):
+            row = rows[flag["pos"]]
+            prev_pos = prev_numbered.get(flag["pos"])
+            inconsistencies.append({
+                "catalogue_id": catalogue_id,
+                "prev_num": str(rows[prev_pos]["num"]).strip() if prev_pos is not None else None,
+                "current_num": str(row["num"]).strip(),
+                "title": row["title"],
+                "excerpt": str(row["text"]).strip(),
+                "kind": flag["kind"],
+                "suggested_num": flag["suggested_num"],
+            })
+
+    inconsistencies_df = pd.DataFrame(inconsistencies)
+    if not inconsistencies_df.empty:
+        inconsistencies_df["suggested_num"] = inconsistencies_df["suggested_num"].astype("Int64")
+    return inconsistencies_df
 
 
 # ---------------------------------------------------------
-# 3️⃣ MAIN
+# 4️⃣ MAIN
 # ---------------------------------------------------------
 def main():
     parent_folder = Path("./imgs_benchmark")
@@ -241,7 +481,7 @@ def main():
 
         # --- Step 2: Postprocessing ---
         chunks_df = split_based_on_gap(chunks_df)
-        chunks_df = merge_sandwiched_errors(chunks_df)
+        chunks_df = repair_lot_sequence(chunks_df)
 
         # --- Step 3: Recalculate inconsistencies ---
         inconsistencies_df = recalc_inconsistencies(chunks_df)
@@ -0,0 +1,113 @@
+import re
+import shutil
+from pathlib import Path
+import pandas as pd
+from pyoxigraph import Literal, NamedNode, Quad, RdfFormat, Store
+
+TRIG_FILE = Path("zac_catalogues.trig")
+CHUNKS_FILE = Path("app/data/all_chunks.csv")
+STORE_DIR = Path("app/data/zac_store")
+
+# Namespaces, as in Zeri_cataloghi_RDF.ipynb
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+CRM = "http://www.cidoc-crm.org/cidoc-crm/"
+ZAC = "http://w3id.org/zac/"
+
+LOTS_GRAPH = NamedNode(ZAC + "lots")
+
+
+# ---------------------------------------------------------
+# 1️⃣ URIS
+# ---------------------------------------------------------
+def create_uri_string(input_string):
+    """
+    Creates a URI-friendly string, as the notebook does for catalogue ids,
+    so that lots attach to the catalogue entities of the TriG.
+    """
+    uri_string = input_string.strip().replace(" ", "_")
+
+    char_replacements = {
+        'à': 'a', 'è': 'e', 'é': 'e', 'ì': 'i', 'ò': 'o', 'ù': 'u',
+        'À': 'A', 'È': 'E', 'É': 'E', 'Ì': 'I', 'Ò': 'O', 'Ù': 'U',
+        "'": "", '"': "", "‘": "", "’": "",
+        "(": "", ")": "", "[": "", "]": "", "{": "", "}": "",
+        ",": "", ";": "", ":": "", ".": "", "!": "", "?": "",
+        "&": "and",
+        "/": "_",
+        "\\": "_",
+    }
+    for old_char, new_char in char_replacements.items():
+        uri_string = uri_string.replace(old_char, new_char)
+
+    uri_string = re.sub(r'[^\w-]', '', uri_string)
+    return uri_string.lower()
+
+
+# ---------------------------------------------------------
+# 2️⃣ LOT TRIPLES
+# ---------------------------------------------------------
+def lot_quads(chunks_df):
+    """
+    Yield lot-level quads from the chunks table. Each chunk becomes a
+    linguistic object composing its catalogue, identified by the chunk
+    index (lot numbers are not unique until the chunks are revised).
+    """
+    def node(local_name):
+        return NamedNode(ZAC + local_name)
+
+    rdf_type = NamedNode(RDF + "type")
+    label = NamedNode(RDFS + "label")
+    lot_class = NamedNode(CRM + "E33_Linguistic_Object")
+    has_type = NamedNode(CRM + "P2_has_type")
+    lot_type = node("auction_lot")
+    composed_of = NamedNode(CRM + "P106_is_composed_of")
+    identifier = NamedNode(CRM + "P48_has_preferred_identifier")
+    content = NamedNode(CRM + "P190_has_symbolic_content")
+
+    for row in chunks_df.itertuples(index=False):
+        catalogue_id = create_uri_string(row.catalogue_id)
+        lot = node(f"{catalogue_id}_lot_{row.index}")
+
+        yield Quad(node(catalogue_id), composed_of, lot, LOTS_GRAPH)
+        yield Quad(lot, rdf_type, lot_class, LOTS_GRAPH)
+        yield Quad(lot, has_type, lot_type, LOTS_GRAPH)
+        if row.num:
+            yield Quad(lot, identifier, Literal(row.num), LOTS_GRAPH)
+        if row.title:
+            yield Quad(lot, label, Literal(row.title), LOTS_GRAPH)
+        if row.text:
+            yield Quad(lot, content, Literal(row.text), LOTS_GRAPH)
+
+
+# ---------------------------------------------------------
+# 3️⃣ MAIN
+# ---------------------------------------------------------
+def main():
+    if not TRIG_FILE.exists():
+        print(f"❌ TriG file not found: {TRIG_FILE}")
+        return
+
+    # The store is rebuilt from scratch, so it always mirrors the inputs
+    if STORE_DIR.exists():
+        shutil.rmtree(STORE_DIR)
+    store = Store(str(STORE_DIR))
+
+    print(f"📘 Loading {TRIG_FILE}")
+    store.bulk_load(path=str(TRIG_FILE), format=RdfFormat.TRIG)
+
+    if CHUNKS_FILE.exists():
+        print(f"📘 Loading lots from {CHUNKS_FILE}")
+        chunks_df = pd.read_csv(CHUNKS_FILE, dtype=str, keep_default_na=False)
+        chunks_df = chunks_df[["catalogue_id", "index", "num", "title", "text"]].apply(lambda col: col.str.strip())
+        store.bulk_extend(lot_quads(chunks_df))
+    else:
+        print(f"⚠️ Skipping lots — missing {CHUNKS_FILE}")
+
+    store.optimize()
+    store.flush()
+    print(f"💾 Saved {len(store)} quads to {STORE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
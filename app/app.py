@@ -1,9 +1,16 @@
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 import pandas as pd
 from pathlib import Path
 import os
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from pyoxigraph import QueryBoolean, QueryResultsFormat, QuerySolutions, RdfFormat, Store
+
+from chunk_store import compact_chunks, expand_chunks, read_table, revision_flags
 
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
@@ -12,43 +19,23 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = Path("data")
 CHUNKS_FILE = DATA_DIR / "all_chunks.csv"
 INCONS_FILE = DATA_DIR / "all_inconsistencies.csv"
+STORE_DIR = DATA_DIR / "zac_store"
 
 # --- Load data ---
-chunks_df = pd.read_csv(CHUNKS_FILE)
-incons_df = pd.read_csv(INCONS_FILE)
-
-# --- Normalize text ---
-def clean_str(s):
-    return str(s).strip() if pd.notna(s) else ""
-
-for df in [chunks_df, incons_df]:
-    for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = df[col].astype(str).map(clean_str)
-
-# --- Build matching keys ---
-chunks_df["key"] = (
-    chunks_df["catalogue_id"].astype(str)
-    + "||"
-    + chunks_df["num"].astype(str)
-    + "||"
-    + chunks_df["text"].astype(str)
-)
-
-incons_df["key"] = (
-    incons_df["catalogue_id"].astype(str)
-    + "||"
-    + incons_df["current_num"].astype(str)
-    + "||"
-    + incons_df["excerpt"].astype(str)
-)
+# Chunks are kept compact (see chunk_store): lot labels that are not plain
+# integers live in the `num_labels` side-table, and no key column is stored.
+chunks_df, num_labels = compact_chunks(read_table(CHUNKS_FILE))
+incons_df = read_table(INCONS_FILE)
 
 # --- Compute revision flags ---
-chunks_df["needs_revision"] = chunks_df["key"].isin(incons_df["key"])
+chunks_df["needs_revision"] = revision_flags(chunks_df, num_labels, incons_df)
+
+# --- Open triple store (built by 3_triple_store.py) ---
+store = Store.read_only(str(STORE_DIR)) if STORE_DIR.exists() else None
 
 # --- Precompute catalogue stats ---
 catalogue_stats = (
-    chunks_df.groupby("catalogue_id")["needs_revision"]
+    chunks_df.groupby("catalogue_id", observed=True)["needs_revision"]
     .agg(["sum", "count"])
     .reset_index()
     .rename(columns={"sum": "issues", "count": "total"})
@@ -72,7 +59,7 @@ def home(request: Request):
 @app.get("/catalogue/{catalogue_id}")
 def view_catalogue(request: Request, catalogue_id: str):
     """Show editable chunks for a single catalogue."""
-    catalogue_chunks = chunks_df[chunks_df["catalogue_id"] == catalogue_id].copy()
+    catalogue_chunks = expand_chunks(chunks_df[chunks_df["catalogue_id"] == catalogue_id], num_labels)
 
     if catalogue_chunks.empty:
         return templates.TemplateResponse(
@@ -116,9 +103,17 @@ async def save_catalogue(request: Request):
 
     # Replace the catalogue’s section
     global chunks_df
-    chunks_df = chunks_df[chunks_df["catalogue_id"] != catalogue_id]
-    chunks_df = pd.concat([chunks_df, pd.DataFrame(updated_rows)], ignore_index=True)
-    chunks_df.to_csv(CHUNKS_FILE, index=False, encoding="utf-8")
+    updated_df, updated_labels = compact_chunks(pd.DataFrame(updated_rows))
+    updated_df["needs_revision"] = revision_flags(updated_df, updated_labels, incons_df)
+    for label_key in [k for k in num_labels if k[0] == catalogue_id]:
+        del num_labels[label_key]
+    num_labels.update(updated_labels)
+
+    chunks_df = pd.concat(
+        [chunks_df[chunks_df["catalogue_id"] != catalogue_id], updated_df], ignore_index=True
+    )
+    chunks_df["catalogue_id"] = chunks_df["catalogue_id"].astype(str).astype("category")
+    expand_chunks(chunks_df, num_labels).to_csv(CHUNKS_FILE, index=False, encoding="utf-8")
 
     return RedirectResponse(f"/catalogue/{catalogue_id}#{anchor}", status_code=303)
 
@@ -141,18 +136,11 @@ def update_chunk(
     chunks_df.loc[mask, "title"] = title.strip()
     chunks_df.loc[mask, "text"] = text.strip()
 
-    # Rebuild keys and recheck inconsistency status
-    chunks_df["key"] = (
-        chunks_df["catalogue_id"].astype(str)
-        + "||"
-        + chunks_df["num"].astype(str)
-        + "||"
-        + chunks_df["text"].astype(str)
-    )
-    chunks_df["needs_revision"] = chunks_df["key"].isin(incons_df["key"])
+    # Recheck inconsistency status
+    chunks_df.loc[mask, "needs_revision"] = revision_flags(chunks_df[mask], num_labels, incons_df)
 
     # Save updated CSV
-    chunks_df.to_csv(CHUNKS_FILE, index=False, encoding="utf-8")
+    expand_chunks(chunks_df, num_labels).to_csv(CHUNKS_FILE, index=False, encoding="utf-8")
 
     return RedirectResponse(url=f"/catalogue/{catalogue_id}", status_code=303)
 
@@ -171,3 +159,117 @@ async def resolve_inconsistency(catalogue_id: str = Form(...), num: str = Form(.
 
     resolved = before != after
     return JSONResponse({"success": resolved})
+
+
+# Query results are serialised under a size cap, and cached bounded in total size per worker
+QUERY_MAX_RESULT_BYTES = 16 * 1024 ** 2
+QUERY_TIMEOUT_SECONDS = 10
+QUERY_CACHE_MAX_BYTES = 32 * 1024 ** 2
+QUERY_CACHE_MAX_RESULT_BYTES = 1024 ** 2
+query_cache = OrderedDict()
+query_cache_bytes = 0
+query_cache_lock = Lock()
+
+# Comments, string literals and IRIs, which may contain the SERVICE keyword harmlessly
+SPARQL_NOISE = re.compile(r'#[^\n]*|"""(?:.|\n)*?"""|\'\'\'(?:.|\n)*?\'\'\'|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|<[^<>\s]*>')
+SERVICE_KEYWORD = re.compile(r'\bSERVICE\b', re.IGNORECASE)
+
+
+def uses_service(query):
+    """Whether a query asks for federated evaluation, which would make the server send requests."""
+    return bool(SERVICE_KEYWORD.search(SPARQL_NOISE.sub(" ", query)))
+
+
+class ResultTooLarge(Exception):
+    pass
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class CappedWriter:
+    """Collects serialised results, aborting the query once they exceed `limit` bytes or run past `timeout`."""
+
+    def __init__(self, limit, timeout):
+        self.limit = limit
+        self.deadline = time.monotonic() + timeout
+        self.size = 0
+        self.chunks = []
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise ResultTooLarge()
+        if time.monotonic() > self.deadline:
+            raise QueryTimeout()
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return b"".join(self.chunks)
+
+
+def run_query(query):
+    """Run a SPARQL query, caching small serialised results (the store is read-only)."""
+    global query_cache_bytes
+    with query_cache_lock:
+        if query in query_cache:
+            query_cache.move_to_end(query)
+            return query_cache[query]
+
+    # Results are evaluated lazily while serialising, so the caps also stop runaway queries
+    results = store.query(query, use_default_graph_as_union=True)
+    writer = CappedWriter(QUERY_MAX_RESULT_BYTES, QUERY_TIMEOUT_SECONDS)
+    if isinstance(results, (QuerySolutions, QueryBoolean)):
+        results.serialize(writer, format=QueryResultsFormat.JSON)
+        result = writer.getvalue(), "application/sparql-results+json"
+    else:
+        results.serialize(writer, format=RdfFormat.N_TRIPLES)
+        result = writer.getvalue(), "application/n-triples"
+
+    size = len(result[0])
+    if size <= QUERY_CACHE_MAX_RESULT_BYTES:
+        with query_cache_lock:
+            if query not in query_cache:
+                query_cache[query] = result
+                query_cache_bytes += size
+            while query_cache_bytes > QUERY_CACHE_MAX_BYTES:
+                _, (content, _) = query_cache.popitem(last=False)
+                query_cache_bytes -= len(content)
+    return result
+
+
+def sparql_response(query):
+    if store is None:
+        return JSONResponse({"error": "Triple store not found, run 3_triple_store.py."}, status_code=503)
+    if uses_service(query):
+        return JSONResponse({"error": "SERVICE is not allowed on this endpoint."}, status_code=400)
+    try:
+        content, media_type = run_query(query.strip())
+    except SyntaxError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except ResultTooLarge:
+        message = f"Results exceed {QUERY_MAX_RESULT_BYTES // 1024 ** 2} MB, add a LIMIT to the query."
+        return JSONResponse({"error": message}, status_code=413)
+    except QueryTimeout:
+        message = f"Query exceeded {QUERY_TIMEOUT_SECONDS} s, add a LIMIT to the query."
+        return JSONResponse({"error": message}, status_code=504)
+    except (RuntimeError, OSError) as e:
+        return JSONResponse({"error": f"Query evaluation failed: {e}"}, status_code=500)
+    return Response(content=content, media_type=media_type)
+
+
+@app.get("/sparql")
+def sparql_get(query: str):
+    """Read-only SPARQL endpoint over the catalogues and lots."""
+    return sparql_response(query)
+
+
+@app.post("/sparql")
+def sparql_post(query: str = Form(...)):
+    """Read-only SPARQL endpoint over the catalogues and lots (form-encoded)."""
+    return sparql_response(query)
@@ -0,0 +1,60 @@
+"""
+Compare the memory footprint of the chunks table as previously loaded by
+the app (object columns plus a text-bearing key) with the compact one.
+
+Run from the app folder: python benchmark_memory.py [path/to/all_chunks.csv]
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from chunk_store import clean_str, compact_chunks
+
+CHUNKS_FILE = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("data") / "all_chunks.csv"
+
+
+def mb(n_bytes):
+    return f"{n_bytes / 1024 ** 2:8.2f} MB"
+
+
+def side_table_size(num_labels):
+    """Approximate size of the lot label side-table (dict, keys and labels)."""
+    return sys.getsizeof(num_labels) + sum(
+        sys.getsizeof(k) + sys.getsizeof(k[0]) + sys.getsizeof(k[1]) + sys.getsizeof(v)
+        for k, v in num_labels.items()
+    )
+
+
+def load_object_chunks(path):
+    """The previous in-process representation: object dtype and a key column."""
+    df = pd.read_csv(path).drop(columns=["key", "needs_revision"], errors="ignore")
+    for col in df.select_dtypes(exclude="number").columns:
+        df[col] = df[col].map(clean_str).astype(object)
+    df["key"] = (
+        df["catalogue_id"].astype(str) + "||" + df["num"].astype(str) + "||" + df["text"].astype(str)
+    ).astype(object)
+    return df
+
+
+def main():
+    raw = pd.read_csv(CHUNKS_FILE, dtype=str, keep_default_na=False)
+    raw_text = sum(len(s.encode("utf-8")) for col in ("title", "text") for s in raw[col])
+
+    object_df = load_object_chunks(CHUNKS_FILE)
+    compact_df, num_labels = compact_chunks(raw.map(clean_str))
+
+    object_size = object_df.memory_usage(deep=True).sum()
+    compact_size = compact_df.memory_usage(deep=True).sum() + side_table_size(num_labels)
+
+    print(f"📊 {len(raw)} chunks, {raw['catalogue_id'].nunique()} catalogues, "
+          f"{len(num_labels)} non-integer lot labels")
+    print(f"raw title+text   {mb(raw_text)}")
+    print(f"object + key     {mb(object_size)}  ({object_size / raw_text:.2f}x raw text)")
+    print(f"compact          {mb(compact_size)}  ({compact_size / raw_text:.2f}x raw text)")
+    print()
+    print(compact_df.memory_usage(deep=True).map(mb).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import re
+import pandas as pd
+
+# Arrow-backed strings keep the text in contiguous buffers instead of one Python object per cell
+TEXT_DTYPE = "string[pyarrow]"
+LOT_PREFIX = re.compile(r'^(\d+)')
+LOT_MAX = 2 ** 31 - 1  # lot numbers are stored as Int32
+
+
+def clean_str(s):
+    return str(s).strip() if pd.notna(s) else ""
+
+
+def read_table(path):
+    """
+    Read a CSV as stripped strings, so that lot numbers such as "14"
+    compare equal whichever file they come from.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for col in df.columns:
+        df[col] = df[col].map(clean_str)
+    return df.drop(columns=["key"], errors="ignore")
+
+
+def split_lot_numbers(catalogue_ids, indexes, nums):
+    """
+    Split lot labels into integer lot numbers and a side-table of the
+    labels that are not plain integers (e.g. "203 bis", "I", "16%") or
+    too large for the lot column, keyed by (catalogue_id, index).
+    """
+    lots = []
+    num_labels = {}
+    for catalogue_id, index, num in zip(catalogue_ids, indexes, nums):
+        label = clean_str(num)
+        m = LOT_PREFIX.match(label)
+        lot = int(m.group(1)) if m else None
+        if lot is not None and lot > LOT_MAX:
+            lot = None  # OCR can produce arbitrarily long numbers; kept as labels only
+        lots.append(lot)
+        if lot is None or str(lot) != label:
+            num_labels[(str(catalogue_id), int(index))] = label
+    return pd.array(lots, dtype="Int32"), num_labels
+
+
+def compact_chunks(df):
+    """
+    Build the in-process chunks table: categorical catalogue_id, integer
+    index and lot columns, Arrow-backed title/text.
+    Returns the table and the lot label side-table.
+    """
+    lots, num_labels = split_lot_numbers(df["catalogue_id"], df["index"], df["num"])
+    compact = pd.DataFrame({
+        "index": df["index"].astype("int32"),
+        "lot": lots,
+        "title": df["title"].astype(TEXT_DTYPE),
+        "text": df["text"].astype(TEXT_DTYPE),
+        "catalogue_id": df["catalogue_id"].astype(str).astype("category"),
+    })
+    return compact, num_labels
+
+
+def lot_labels(df, num_labels):
+    """Rebuild the original `num` label of each row."""
+    return [
+        num_labels.get((catalogue_id, index), "" if pd.isna(lot) else str(lot))
+        for catalogue_id, index, lot in zip(df["catalogue_id"], df["index"], df["lot"])
+    ]
+
+
+def revision_flags(df, num_labels, incons_df):
+    """
+    Flag chunks listed in the inconsistencies table, matching on
+    (catalogue_id, num, text) without materialising a key column.
+    """
+    keys = set(zip(incons_df["catalogue_id"], incons_df["current_num"], incons_df["excerpt"]))
+    return [
+        (catalogue_id, num, text) in keys
+        for catalogue_id, num, text in zip(df["catalogue_id"], lot_labels(df, num_labels), df["text"])
+    ]
+
+
+def expand_chunks(df, num_labels):
+    """Return rows with their original `num` label, as stored in the CSV."""
+    expanded = df.drop(columns=["lot"])
+    expanded.insert(1, "num", lot_labels(df, num_labels))
+    return expanded